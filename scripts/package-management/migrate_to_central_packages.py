@@ -1,73 +1,120 @@
 #!/usr/bin/env python3
-import xml.etree.ElementTree as ET
 import os
 from pathlib import Path
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Register XML namespace
-ET.register_namespace('', 'http://schemas.microsoft.com/developer/msbuild/2003')
+# Prefer lxml's C parser when available; fall back to the stdlib ElementTree
+try:
+    from lxml import etree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+    # Register XML namespace (lxml preserves prefixes natively)
+    ET.register_namespace('', 'http://schemas.microsoft.com/developer/msbuild/2003')
+
+# Directory names that are never descended into when searching for projects
+EXCLUDE_DIRS = frozenset({'.git', 'bin', 'obj', 'packages', 'node_modules'})
 
 def backup_file(filepath):
     """Create a backup of the file"""
     backup_path = f"{filepath}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    shutil.copy2(filepath, backup_path)
+    shutil.copyfile(filepath, backup_path)
     return backup_path
 
-def update_csproj_file(csproj_path, dry_run=False):
-    """Update a .csproj file to remove Version attributes from PackageReference elements"""
+def update_csproj_file(csproj_path, dry_run=False, log=print, tree=None):
+    """Update a .csproj file to remove Version attributes from PackageReference elements
+    
+    Returns a (tree, changes_made) tuple; pass the tree back in to skip re-parsing.
+    """
     try:
-        # Parse the XML file
-        tree = ET.parse(csproj_path)
+        # Parse the XML file unless a previously parsed tree was supplied
+        if tree is None:
+            tree = ET.parse(csproj_path)
         root = tree.getroot()
         
         changes_made = False
         
-        # Find all PackageReference elements
-        for item_group in root.findall('.//ItemGroup'):
-            for package_ref in item_group.findall('PackageReference'):
-                if 'Version' in package_ref.attrib:
-                    package_name = package_ref.get('Include')
-                    version = package_ref.get('Version')
-                    
-                    if not dry_run:
-                        # Remove the Version attribute
-                        del package_ref.attrib['Version']
-                        changes_made = True
-                    
-                    print(f"  - {package_name}: {version}")
+        # Find all PackageReference elements in a single pass over the tree
+        for package_ref in root.iterfind('.//ItemGroup/PackageReference'):
+            if 'Version' in package_ref.attrib:
+                package_name = package_ref.get('Include')
+                version = package_ref.get('Version')
+                
+                if not dry_run:
+                    # Remove the Version attribute
+                    del package_ref.attrib['Version']
+                changes_made = True
+                
+                log(f"  - {package_name}: {version}")
         
         if changes_made and not dry_run:
             # Create backup
             backup_path = backup_file(csproj_path)
-            print(f"  Backup created: {backup_path}")
+            log(f"  Backup created: {backup_path}")
             
             # Write the updated XML
             tree.write(csproj_path, encoding='utf-8', xml_declaration=True)
-            print(f"  ✓ Updated successfully")
+            log(f"  ✓ Updated successfully")
         
-        return changes_made
+        return tree, changes_made
         
     except Exception as e:
-        print(f"  ✗ Error: {e}")
-        return False
+        log(f"  ✗ Error: {e}")
+        return None, False
+
+def iter_csproj_files(root, exclude_patterns):
+    """Yield .csproj files under root, never descending into excluded directories"""
+    try:
+        entries = os.scandir(root)
+    except OSError:
+        # Skip unreadable or vanished directories, as os.walk does
+        return
+    
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                # Prune excluded directories before descending into them
+                if entry.name in exclude_patterns:
+                    continue
+                yield from iter_csproj_files(entry.path, exclude_patterns)
+            elif entry.name[0] != '.' and entry.name.endswith('.csproj') and entry.is_file():
+                # Skip hidden files; DirEntry caches the file type, so is_file() costs no extra stat
+                yield entry.path
 
 def find_csproj_files(exclude_patterns=None):
     """Find all .csproj files in the project"""
-    if exclude_patterns is None:
-        exclude_patterns = []
-    
-    csproj_files = []
-    for root, dirs, files in os.walk('.'):
-        # Skip certain directories
-        if any(pattern in root for pattern in exclude_patterns):
-            continue
-            
-        for file in files:
-            if file.endswith('.csproj'):
-                csproj_files.append(os.path.join(root, file))
+    exclude_patterns = frozenset(exclude_patterns or ())
     
-    return sorted(csproj_files)
+    return sorted(iter_csproj_files('.', exclude_patterns))
+
+def process_csproj_files(csproj_files, dry_run=False, parsed_trees=None):
+    """Update .csproj files concurrently, printing each file's output in order
+    
+    Parsed trees are stored in parsed_trees so a later pass can reuse them.
+    """
+    if parsed_trees is None:
+        parsed_trees = {}
+    
+    def process(csproj_path):
+        messages = []
+        tree, changed = update_csproj_file(csproj_path, dry_run, log=messages.append,
+                                           tree=parsed_trees.get(csproj_path))
+        return tree, changed, messages
+    
+    updated_count = 0
+    with ThreadPoolExecutor() as executor:
+        for csproj_path, (tree, changed, messages) in zip(csproj_files, executor.map(process, csproj_files)):
+            if tree is not None:
+                parsed_trees[csproj_path] = tree
+            print(f"\nProcessing: {csproj_path}")
+            for message in messages:
+                print(message)
+            if changed:
+                updated_count += 1
+    
+    return updated_count
 
 def main():
     """Main function"""
@@ -81,8 +128,7 @@ def main():
         return 1
     
     # Find all .csproj files
-    exclude_patterns = ['.git', 'bin', 'obj', 'packages', 'node_modules']
-    csproj_files = find_csproj_files(exclude_patterns)
+    csproj_files = find_csproj_files(EXCLUDE_DIRS)
     
     print(f"\nFound {len(csproj_files)} .csproj files")
     
@@ -98,27 +144,26 @@ def main():
     if dry_run:
         print("\n--- DRY RUN MODE ---")
     
-    # Process each file
-    updated_count = 0
-    for csproj_path in csproj_files:
-        print(f"\nProcessing: {csproj_path}")
-        if update_csproj_file(csproj_path, dry_run):
-            updated_count += 1
+    # Process each file, keeping the parsed trees for the real run after a dry run
+    parsed_trees = {}
+    updated_count = process_csproj_files(csproj_files, dry_run, parsed_trees)
     
     if dry_run:
+        # A dry run writes nothing; keep its count separate from the real one
+        would_update = updated_count
+        updated_count = 0
         print(f"\n--- DRY RUN COMPLETE ---")
-        print(f"Would update {updated_count} files")
+        print(f"Would update {would_update} files")
         
-        if updated_count > 0:
+        if would_update > 0:
             response = input("\nProceed with actual migration? (y/N): ")
-            if response.lower() == 'y':
-                # Run again without dry_run
-                updated_count = 0
-                print("\n--- ACTUAL MIGRATION ---")
-                for csproj_path in csproj_files:
-                    print(f"\nProcessing: {csproj_path}")
-                    if update_csproj_file(csproj_path, dry_run=False):
-                        updated_count += 1
+            if response.lower() != 'y':
+                print("\nMigration cancelled. No files were changed.")
+                return 0
+            
+            # Run again without dry_run
+            print("\n--- ACTUAL MIGRATION ---")
+            updated_count = process_csproj_files(csproj_files, dry_run=False, parsed_trees=parsed_trees)
     
     print(f"\n✓ Migration complete! Updated {updated_count} files.")
     print("\nNext steps:")